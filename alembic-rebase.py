@@ -17,18 +17,39 @@ import functools
 import logging
 import re
 import sys
-from collections.abc import Callable
+from collections.abc import Callable, Sequence
 from pathlib import Path
 
 from alembic import command
 from alembic.config import Config
 from alembic.script import ScriptDirectory
+from alembic.script.revision import RevisionError
 from sqlalchemy.engine import Connection
 from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from yarl import URL
 
 logger = logging.getLogger(__name__)
 
+# Revision identifier assignments in migration files
+_REVISION_RE = re.compile(r"^revision\s*=\s*['\"]([^'\"]+)['\"]", re.MULTILINE)
+_DOWN_REVISION_RE = re.compile(r"^down_revision\s*=\s*(['\"]([^'\"]*)['\"]|None)", re.MULTILINE)
+
+# Elements every migration file must contain
+_REQUIRED_MIGRATION_PATTERNS = (
+    _REVISION_RE,  # revision = 'xxx'
+    _DOWN_REVISION_RE,  # down_revision = 'xxx' or None
+    re.compile(r"def upgrade\(\)"),  # upgrade function
+    re.compile(r"def downgrade\(\)"),  # downgrade function
+)
+
+
+def _first_parent(down_revision: str | Sequence[str] | None) -> str | None:
+    """Return the parent followed by chain walks for a down_revision value."""
+    if down_revision is None or isinstance(down_revision, str):
+        return down_revision or None
+    # Handle merge points - take the first parent for simplicity
+    return down_revision[0] if down_revision else None
+
 
 class AlembicRebaseError(Exception):
     """Custom exception for alembic rebase operations."""
@@ -77,6 +98,28 @@ class AlembicRebase:
         logger.info(f"Script location: {self.script_dir.dir}")
 
         self._async_engine = None
+        self._migration_files: dict[str, Path] = {}
+        self._parsed_headers: dict[Path, tuple[int, tuple[str, str | None]]] = {}
+
+    @functools.cached_property
+    def _revision_links(self) -> dict[str, tuple[str, str | None]]:
+        """Memo of (revision, first parent) per looked-up revision, shared by chain walks.
+
+        Seeded with every revision in the script directory in a single pass, so chain
+        walks only fall back to per-revision lookups for IDs missing from the index.
+        """
+        links: dict[str, tuple[str, str | None]] = {}
+        try:
+            for script in self.script_dir.walk_revisions():
+                links[script.revision] = (script.revision, _first_parent(script.down_revision))
+        except RevisionError as e:
+            logger.warning(f"Could not index revisions from script directory: {e}")
+        return links
+
+    @functools.cached_property
+    def _migration_chains(self) -> dict[str, tuple[str, ...]]:
+        """Memo of the root-first migration chain per looked-up revision."""
+        return {}
 
     def _get_async_engine(self) -> AsyncEngine:
         """Get or create async engine for database operations."""
@@ -207,24 +250,36 @@ class AlembicRebase:
         Part of Phase 1: Analysis and Validation.
         Builds migration chains by following down_revision links from the given
         revision back to the root, then returns the chain in chronological order.
+        Chains are memoized per revision, so a walk stops at the first ancestor
+        whose chain is already known.
         """
         assert self.script_dir is not None, "Script directory not initialized"
 
-        script = self.script_dir.get_revision(revision)
+        chains = self._migration_chains
+        if (cached := chains.get(revision)) is not None:
+            return list(cached)
+
+        links = self._revision_links
         chain = []
+        prefix: tuple[str, ...] = ()
+        current: str | None = revision
 
-        while script:
-            chain.append(script.revision)
-            if script.down_revision:
-                if isinstance(script.down_revision, (list, tuple)):
-                    # Handle merge points - take the first parent for simplicity
-                    script = self.script_dir.get_revision(script.down_revision[0])
-                else:
-                    script = self.script_dir.get_revision(script.down_revision)
-            else:
+        while current:
+            if (prefix_chain := chains.get(current)) is not None:
+                prefix = prefix_chain
                 break
-
-        return list(reversed(chain))
+            link = links.get(current)
+            if link is None:
+                script = self.script_dir.get_revision(current)
+                if not script:
+                    break
+                link = links[current] = (script.revision, _first_parent(script.down_revision))
+            chain.append(link[0])
+            current = link[1]
+
+        chain.reverse()
+        chains[revision] = prefix + tuple(chain)
+        return [*prefix, *chain]
 
     def _find_common_ancestor(self, top_head: str, base_head: str) -> str | None:
         """Find the common ancestor of two migration heads.
@@ -250,11 +305,17 @@ class AlembicRebase:
         """Find the migration file for a given revision using alembic API."""
         assert self.script_dir is not None, "Script directory not initialized"
 
+        # Migration files keep their paths while rebasing, so resolved lookups can be reused
+        if (file_path := self._migration_files.get(revision)) is not None:
+            return file_path
+
         try:
             # Use alembic's built-in method to get the revision
             revision_obj = self.script_dir.get_revision(revision)
             if revision_obj and revision_obj.path:
-                return Path(revision_obj.path)
+                file_path = Path(revision_obj.path)
+                self._migration_files[revision] = file_path
+                return file_path
 
             logger.debug(f"Revision {revision} not found in script directory")
             return None
@@ -268,23 +329,51 @@ class AlembicRebase:
         content = file_path.read_text()
 
         # Extract revision ID
-        revision_match = re.search(r"^revision\s*=\s*['\"]([^'\"]+)['\"]", content, re.MULTILINE)
+        revision_match = _REVISION_RE.search(content)
         if not revision_match:
             raise AlembicRebaseError(f"Could not find revision in {file_path}")
         revision = revision_match.group(1)
 
         # Extract down_revision
-        down_revision_match = re.search(
-            r"^down_revision\s*=\s*(['\"]([^'\"]*)['\"]|None)",
-            content,
-            re.MULTILINE,
-        )
+        down_revision_match = _DOWN_REVISION_RE.search(content)
         down_revision = None
         if down_revision_match and down_revision_match.group(1) != "None":
             down_revision = down_revision_match.group(2)
 
         return revision, down_revision, content
 
+    def _parse_migration_header(self, file_path: Path) -> tuple[str, str | None]:
+        """Parse only the revision and down_revision from a migration file.
+
+        Reading stops once both assignments are found, so the migration body is skipped.
+        Parsed headers are cached until the file's modification time changes.
+        """
+        mtime_ns = file_path.stat().st_mtime_ns
+        cached_header = self._parsed_headers.get(file_path)
+        if cached_header is not None and cached_header[0] == mtime_ns:
+            return cached_header[1]
+
+        revision = None
+        down_revision = None
+        found_down_revision = False
+        with file_path.open() as f:
+            for line in f:
+                if revision is None and (revision_match := _REVISION_RE.match(line)):
+                    revision = revision_match.group(1)
+                elif not found_down_revision and (
+                    down_revision_match := _DOWN_REVISION_RE.match(line)
+                ):
+                    found_down_revision = True
+                    if down_revision_match.group(1) != "None":
+                        down_revision = down_revision_match.group(2)
+                if revision is not None and found_down_revision:
+                    break
+
+        if revision is None:
+            raise AlembicRebaseError(f"Could not find revision in {file_path}")
+        self._parsed_headers[file_path] = (mtime_ns, (revision, down_revision))
+        return revision, down_revision
+
     def _update_migration_file(
         self,
         file_path: Path,
@@ -296,32 +385,27 @@ class AlembicRebase:
 
         content = file_path.read_text()
 
-        # Update revision
-        content = re.sub(
-            r"^revision\s*=\s*['\"]([^'\"]+)['\"]",
-            f'revision = "{new_revision}"',
-            content,
-            flags=re.MULTILINE,
-        )
-
-        # Update down_revision
-        if new_down_revision:
-            content = re.sub(
-                r"^down_revision\s*=\s*(['\"]([^'\"]*)['\"]|None)",
-                f'down_revision = "{new_down_revision}"',
-                content,
-                flags=re.MULTILINE,
-            )
-        else:
-            content = re.sub(
-                r"^down_revision\s*=\s*(['\"]([^'\"]*)['\"]|None)",
-                "down_revision = None",
-                content,
-                flags=re.MULTILINE,
-            )
+        # Update revision (only when it actually changes)
+        revision_match = _REVISION_RE.search(content)
+        if revision_match and revision_match.group(1) != new_revision:
+            start, end = revision_match.span()
+            content = f'{content[:start]}revision = "{new_revision}"{content[end:]}'
+
+        # Update down_revision (only when it actually changes)
+        down_revision_match = _DOWN_REVISION_RE.search(content)
+        if down_revision_match and (down_revision_match.group(2) or None) != (
+            new_down_revision or None
+        ):
+            if new_down_revision:
+                down_revision_line = f'down_revision = "{new_down_revision}"'
+            else:
+                down_revision_line = "down_revision = None"
+            start, end = down_revision_match.span()
+            content = f"{content[:start]}{down_revision_line}{content[end:]}"
 
-        # Write updated content back to the same file (revision ID unchanged)
+        # Write updated content back to the same file
         file_path.write_text(content)
+        self._parsed_headers.pop(file_path, None)
 
         logger.info(f"Updated migration file linkage: {file_path.name}")
 
@@ -337,6 +421,7 @@ class AlembicRebase:
         logger.info("Updating migration file linkage for rebase...")
 
         # Update migration files (keeping original revision IDs)
+        skipped = 0
         for i, revision in enumerate(migrations_to_rebase):
             file_path = self._find_migration_file(revision)
             if not file_path:
@@ -350,9 +435,18 @@ class AlembicRebase:
                 # Subsequent migrations point to previous migration in the rebased chain
                 new_down_revision = migrations_to_rebase[i - 1]
 
+            # Files that already point to the right parent are left untouched
+            _, current_down_revision = self._parse_migration_header(file_path)
+            if current_down_revision == new_down_revision:
+                skipped += 1
+                continue
+
             # Update only the down_revision, keep original revision ID
             self._update_migration_file(file_path, revision, revision, new_down_revision)
 
+        if skipped:
+            logger.info(f"Skipped {skipped} migration file(s) with up-to-date linkage")
+
     def _validate_migration_file_integrity(self, revision: str) -> bool:
         """Validate that a migration file has proper structure and syntax.
 
@@ -367,16 +461,11 @@ class AlembicRebase:
             content = file_path.read_text()
 
             # Check for required elements
-            required_patterns = [
-                r"^revision\s*=\s*['\"][^'\"]+['\"]",  # revision = 'xxx'
-                r"^down_revision\s*=\s*(['\"][^'\"]*['\"]|None)",  # down_revision = 'xxx' or None
-                r"def upgrade\(\)",  # upgrade function
-                r"def downgrade\(\)",  # downgrade function
-            ]
-
-            for pattern in required_patterns:
-                if not re.search(pattern, content, re.MULTILINE):
-                    logger.error(f"Migration file {file_path} missing required pattern: {pattern}")
+            for pattern in _REQUIRED_MIGRATION_PATTERNS:
+                if not pattern.search(content):
+                    logger.error(
+                        f"Migration file {file_path} missing required pattern: {pattern.pattern}"
+                    )
                     return False
 
             # Try to compile the Python code
@@ -401,7 +490,7 @@ class AlembicRebase:
                 logger.error(f"Migration file not found for revision: {revision}")
                 return False
 
-            _, down_revision, _ = self._parse_migration_file(file_path)
+            _, down_revision = self._parse_migration_header(file_path)
 
             if i == 0:
                 # First migration can have any down_revision
@@ -477,7 +566,7 @@ class AlembicRebase:
 
             file_path = self._find_migration_file(revision)
             if file_path:
-                _, current_down_rev, _ = self._parse_migration_file(file_path)
+                _, current_down_rev = self._parse_migration_header(file_path)
                 if current_down_rev != new_down_rev:
                     print(f"  {file_path.name}:")
                     print(f"    down_revision: {current_down_rev} → {new_down_rev}")
@@ -597,8 +686,8 @@ class AlembicRebase:
         logger.info("Rebase completed successfully!")
 
 
-async def main() -> None:
-    """Main entry point for the script."""
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line argument parser of the script."""
     parser = argparse.ArgumentParser(
         description="Rebase alembic migrations when heads are diverged",
         formatter_class=argparse.RawDescriptionHelpFormatter,
@@ -629,7 +718,12 @@ Examples:
         action="store_true",
         help="Perform analysis without executing database migrations (dry run mode)",
     )
-    args = parser.parse_args()
+    return parser
+
+
+async def main() -> None:
+    """Main entry point for the script."""
+    args = build_parser().parse_args()
     logging.basicConfig(
         level=logging.INFO,
         format="[%(levelname)s] %(message)s",
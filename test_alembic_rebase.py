@@ -1,40 +1,20 @@
 #!/usr/bin/env python3
 """Test suite for alembic rebase script with isolated PostgreSQL environment."""
 
-import os
 import shutil
-import tempfile
 from functools import partial
-from pathlib import Path
 from unittest.mock import Mock, patch
 
 import pytest
 from alembic import command
+from alembic.script import ScriptDirectory
 from testcontainers.postgres import PostgresContainer
 
-from alembic_rebase import AlembicRebase, AlembicRebaseError
-
-
-class TestAlembicRebase:
-    """Test suite for AlembicRebase functionality."""
-
-    @pytest.fixture(scope="class")
-    def postgres_container(self):
-        """Set up a PostgreSQL container for testing."""
-        with PostgresContainer("postgres:15", driver="asyncpg") as postgres:
-            yield postgres
-
-    @pytest.fixture
-    def temp_alembic_env(self, postgres_container):
-        """Create a temporary alembic environment for testing."""
-        temp_dir = Path(tempfile.mkdtemp())
+from alembic_rebase import AlembicRebase, AlembicRebaseError, build_parser
 
-        try:
-            # Create alembic.ini
-            alembic_ini = temp_dir / "alembic.ini"
-            config_content = f"""[alembic]
-script_location = migrations
-sqlalchemy.url = {postgres_container.get_connection_url()}
+_ALEMBIC_INI_TEMPLATE = """[alembic]
+script_location = %(here)s/migrations
+sqlalchemy.url = {sqlalchemy_url}
 
 [post_write_hooks]
 
@@ -72,15 +52,8 @@ formatter = generic
 format = %(levelname)-5.5s [%(name)s] %(message)s
 datefmt = %H:%M:%S
 """
-            alembic_ini.write_text(config_content)
-
-            # Create migrations directory structure
-            migrations_dir = temp_dir / "migrations"
-            migrations_dir.mkdir()
 
-            # Create alembic env.py
-            env_py = migrations_dir / "env.py"
-            env_py_content = """
+_ENV_PY = """
 from logging.config import fileConfig
 from sqlalchemy import engine_from_config
 from sqlalchemy import pool
@@ -131,11 +104,8 @@ if context.is_offline_mode():
 else:
     run_migrations_online()
 """
-            env_py.write_text(env_py_content)
 
-            # Create script.py.mako
-            script_mako = migrations_dir / "script.py.mako"
-            script_mako_content = '''"""${message}
+_SCRIPT_MAKO = '''"""${message}
 
 Revision ID: ${up_revision}
 Revises: ${down_revision | comma,n}
@@ -160,19 +130,47 @@ def upgrade() -> None:
 def downgrade() -> None:
     ${downgrades if downgrades else "pass"}
 '''
-            script_mako.write_text(script_mako_content)
 
-            # Create versions directory
-            versions_dir = migrations_dir / "versions"
-            versions_dir.mkdir()
 
-            # Initialize alembic
-            os.chdir(temp_dir)
+@pytest.fixture(scope="session")
+def _alembic_env_template(tmp_path_factory):
+    """Build the migrations directory shared by every alembic environment once per session."""
+    template_dir = tmp_path_factory.mktemp("alembic_template")
+
+    # Create migrations directory structure
+    migrations_dir = template_dir / "migrations"
+    migrations_dir.mkdir()
+    (migrations_dir / "env.py").write_text(_ENV_PY)
+    (migrations_dir / "script.py.mako").write_text(_SCRIPT_MAKO)
+
+    # Create versions directory
+    (migrations_dir / "versions").mkdir()
+
+    return template_dir
+
+
+class TestAlembicRebase:
+    """Test suite for AlembicRebase functionality."""
+
+    @pytest.fixture(scope="class")
+    def postgres_container(self):
+        """Set up a PostgreSQL container for testing."""
+        with PostgresContainer("postgres:15", driver="asyncpg") as postgres:
+            yield postgres
+
+    @pytest.fixture
+    def temp_alembic_env(self, postgres_container, _alembic_env_template, tmp_path):
+        """Create a temporary alembic environment for testing."""
+        temp_dir = tmp_path
+        shutil.copytree(_alembic_env_template, temp_dir, dirs_exist_ok=True)
 
-            yield temp_dir, alembic_ini, postgres_container
+        # Create alembic.ini pointing at the test database
+        alembic_ini = temp_dir / "alembic.ini"
+        alembic_ini.write_text(
+            _ALEMBIC_INI_TEMPLATE.format(sqlalchemy_url=postgres_container.get_connection_url())
+        )
 
-        finally:
-            shutil.rmtree(temp_dir)
+        return temp_dir, alembic_ini, postgres_container
 
     def test_alembic_rebase_initialization(self, temp_alembic_env):
         """Test AlembicRebase initialization and configuration loading."""
@@ -327,7 +325,7 @@ def downgrade() -> None:
             rebase = AlembicRebase(None)
 
             # Mock script_dir and its methods
-            mock_script_dir = Mock()
+            mock_script_dir = Mock(spec=ScriptDirectory)
 
             # Set up revision hierarchy
             def mock_get_revision(rev_id):
@@ -339,6 +337,7 @@ def downgrade() -> None:
                 return revisions.get(rev_id)
 
             mock_script_dir.get_revision = mock_get_revision
+            mock_script_dir.walk_revisions.return_value = []  # Resolve every step lazily
             rebase.script_dir = mock_script_dir
 
             chain = rebase._get_migration_chain("rev3")
@@ -423,26 +422,11 @@ def downgrade() -> None:
 
 def test_main_cli_args():
     """Test command line argument parsing."""
-    import sys
-    from unittest.mock import patch
-
-    # Test basic argument parsing
-    test_args = ["alembic_rebase.py", "base456", "top123"]
-    with patch.object(sys, "argv", test_args):
-        # Import here to avoid running main during import
-
-        # Just test that argument parsing works
-        import argparse
-
-        parser = argparse.ArgumentParser()
-        parser.add_argument("base_head")
-        parser.add_argument("top_head")
-        parser.add_argument("--alembic-ini", default="alembic.ini")
-
-        args = parser.parse_args(["base456", "top123"])
-        assert args.base_head == "base456"
-        assert args.top_head == "top123"
-        assert args.alembic_ini == "alembic.ini"
+    args = build_parser().parse_args(["base456", "top123"])
+    assert args.base_head == "base456"
+    assert args.top_head == "top123"
+    assert args.config == "alembic.ini"
+    assert not args.dry_run
 
 
 if __name__ == "__main__":